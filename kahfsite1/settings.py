@@ -194,6 +194,12 @@ CACHES = {
     }
 }
 
+# ==============================
+# Quran audio
+# - مجلد محلي يُسمح بقراءة روابط file:// منه عند فحص الصوت (للملفات التجريبية فقط)
+# ==============================
+QURAN_AUDIO_LOCAL_ROOT = os.getenv("QURAN_AUDIO_LOCAL_ROOT") or None
+
 # ==============================
 # Security (prod)
 # ==============================
@@ -5,6 +5,8 @@ from quran.api_views import (
     ayah_detail,
     search,
     surah_audio_map,
+    concordance,
+    frequency,
 )
 
 urlpatterns = [
@@ -12,4 +14,6 @@ urlpatterns = [
     path("surah/<int:number>/ayah/<int:ayah>", ayah_detail, name="ayah_detail"),
     path("search", search, name="search"),
     path("surah/<int:number>/audio", surah_audio_map, name="surah_audio"),
+    path("concordance", concordance, name="concordance"),
+    path("frequency", frequency, name="frequency"),
 ]
@@ -1,20 +1,25 @@
 # quran/api_views.py
 from __future__ import annotations
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
+from bisect import bisect_right
+import hashlib
 import re
-import requests
 from requests import RequestException
 
 from django.shortcuts import get_object_or_404
+from django.core.cache import cache
+from django.db.models import Count, Max
 from django.views.decorators.cache import cache_page
 
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 
-from quran.models import Surah, Ayah
+from quran.models import Surah, Ayah, AudioManifest
 from quran.serializers import SurahSerializer, AyahSerializer
 from quran.utils import normalize_arabic
+from quran.concordance import frequency_table, word_locations, concordance_lines
+from quran.audio import RECITERS, PREFETCH_WINDOW, fetch_audio_items, prefetch_plan
 
 
 # -------------------------------------------------
@@ -22,16 +27,12 @@ from quran.utils import normalize_arabic
 # -------------------------------------------------
 _SURAH_MIN, _SURAH_MAX = 1, 114
 _LIMIT_MAX = 50
+_FREQ_LIMIT_MAX = 500
+_CONTEXT_MAX = 10
+_PREFETCH_MAX = 8
 _HL_TAG_START = "<mark>"
 _HL_TAG_END = "</mark>"
-
-RECITERS = {
-    "minshawi": "ar.minshawi",
-    "afasy": "ar.alafasy",
-    "ajamy": "ar.ajamy",
-    "husary": "ar.husary",
-}
-AUDIO_API_BASE = "https://api.alquran.cloud/v1"
+_SEARCH_CACHE_TIMEOUT = 60 * 10
 
 
 # -------------------------------------------------
@@ -86,6 +87,35 @@ def ayah_detail(request, number: int = 18, ayah: int = 1):
 # -------------------------------------------------
 # البحث في السورة
 # -------------------------------------------------
+def _search_version(surah: Surah) -> str:
+    """
+    نسخة آيات السورة (العدد، أكبر معرّف، آخر تعديل) — تتغير مع أي إضافة أو حذف
+    أو حفظ على Ayah، فيتبع مفتاح الكاش البيانات التي يخزّنها.
+    """
+    agg = Ayah.objects.filter(surah=surah).aggregate(n=Count("id"), top=Max("id"), ts=Max("updated_at"))
+    ts = agg["ts"].timestamp() if agg["ts"] else 0
+    return f"{agg['n']}-{agg['top'] or 0}-{ts:.6f}"
+
+
+def _search_matches(surah: Surah, q_norm: str) -> List[Tuple[int, int]]:
+    """
+    أزواج (رقم الآية، المعرّف) للآيات المطابقة مرتبة حسب رقم الآية.
+    تُخزَّن في الكاش (LRU + TTL) بمفتاح (النص المُطبَّع، السورة، نسخة الآيات)
+    فتصبح الصفحات التالية شريحة من القائمة + جلب بالمفتاح الأساسي.
+    """
+    digest = hashlib.md5(q_norm.encode("utf-8")).hexdigest()
+    key = f"quran:search:{surah.number}:{digest}:{_search_version(surah)}"
+    matches = cache.get(key)
+    if matches is None:
+        matches = list(
+            Ayah.objects.filter(surah=surah, normalized__icontains=q_norm)
+            .order_by("number")
+            .values_list("number", "id")
+        )
+        cache.set(key, matches, _SEARCH_CACHE_TIMEOUT)
+    return matches
+
+
 @api_view(["GET"])
 def search(request):
     """
@@ -93,6 +123,7 @@ def search(request):
     - q: نص البحث (مطلوب)
     - surah: رقم السورة (افتراضي 18)
     - offset/limit: ترقيم النتائج (limit<=50)
+    - after=<ayah id>: ترقيم بالمؤشر بدل offset (استخدم next_after من الصفحة السابقة)
     - highlight=1: تظليل المطابقة بـ <mark>
     """
     raw_q = (request.GET.get("q") or "").strip()
@@ -111,6 +142,7 @@ def search(request):
     surah_num = _bound(_safe_int(request.GET.get("surah"), 18), _SURAH_MIN, _SURAH_MAX)
     offset = max(0, _safe_int(request.GET.get("offset"), 0))
     limit = _bound(_safe_int(request.GET.get("limit"), 20), 1, _LIMIT_MAX)
+    after = request.GET.get("after")
     do_hl = _safe_int(request.GET.get("highlight"), 0) == 1
 
     surah = get_object_or_404(Surah, number=surah_num)
@@ -118,9 +150,22 @@ def search(request):
     if not q_norm:
         return Response({"hits": 0, "results": []}, status=status.HTTP_200_OK)
 
-    qs = Ayah.objects.filter(surah=surah, normalized__icontains=q_norm).order_by("number")
-    total = qs.count()
-    rows = list(qs[offset : offset + limit])
+    matches = _search_matches(surah, q_norm)
+    total = len(matches)
+    if after:
+        # ترقيم بالمؤشر (keyset): أول المطابقات برقم آية أكبر من آية المؤشر
+        after_id = _safe_int(after, -1)
+        after_num = next((n for n, i in matches if i == after_id), None)
+        if after_num is None:
+            after_num = (
+                Ayah.objects.filter(pk=after_id, surah=surah).values_list("number", flat=True).first()
+            )
+        if after_num is None:
+            return Response({"detail": "قيمة after غير صحيحة."}, status=status.HTTP_400_BAD_REQUEST)
+        offset = bisect_right(matches, after_num, key=lambda m: m[0])
+    page_ids = [i for _, i in matches[offset : offset + limit]]
+    by_id = Ayah.objects.in_bulk(page_ids)
+    rows = [by_id[i] for i in page_ids if i in by_id]
 
     results: List[Dict[str, Any]] = []
     if do_hl:
@@ -138,6 +183,7 @@ def search(request):
             "offset": offset,
             "limit": limit,
             "count": len(results),
+            "next_after": page_ids[-1] if page_ids and offset + limit < total else None,
             "results": results,
         },
         status=status.HTTP_200_OK,
@@ -145,37 +191,145 @@ def search(request):
 
 
 # -------------------------------------------------
-# تشغيل الصوتيات (القراءات المختلفة)
+# فهرس الكلمات (concordance) والتكرار
 # -------------------------------------------------
+def _surah_scope(request) -> int | None:
+    """رقم السورة من الاستعلام، أو None للمصحف كاملًا."""
+    raw = request.GET.get("surah")
+    if raw in (None, "", "all"):
+        return None
+    return _bound(_safe_int(raw, 18), _SURAH_MIN, _SURAH_MAX)
+
+
 @api_view(["GET"])
-@cache_page(60 * 60)
-def surah_audio_map(request, number: int = 18):
+def concordance(request):
     """
-    GET /api/surah/18/audio?reciter=minshawi
-    جلب روابط الصوت للسورة من API خارجي (alquran.cloud).
+    GET /api/concordance?word=كلمة[&surah=18&offset=0&limit=20&context=5]
+    - word: الكلمة (تُطبَّع كما في البحث) (مطلوب)
+    - surah: رقم السورة (افتراضي: المصحف كاملًا)
+    - context: عدد الكلمات قبل/بعد الكلمة (<=10)
     """
-    num = _bound(_safe_int(number, 18), _SURAH_MIN, _SURAH_MAX)
-    rec = (request.GET.get("reciter") or "minshawi").lower().strip()
-    edition = RECITERS.get(rec, rec)
+    word = normalize_arabic((request.GET.get("word") or "").strip())
+    if not word or " " in word:
+        return Response(
+            {"hits": 0, "results": [], "detail": "حقل word مطلوب (كلمة واحدة)."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    surah_num = _surah_scope(request)
+    offset = max(0, _safe_int(request.GET.get("offset"), 0))
+    limit = _bound(_safe_int(request.GET.get("limit"), 20), 1, _LIMIT_MAX)
+    context = _bound(_safe_int(request.GET.get("context"), 5), 0, _CONTEXT_MAX)
 
+    locs = word_locations(word, surah_num)
+    results = concordance_lines(locs[offset : offset + limit], context)
+
+    return Response(
+        {
+            "word": word,
+            "surah": surah_num,
+            "hits": len(locs),
+            "offset": offset,
+            "limit": limit,
+            "count": len(results),
+            "results": results,
+        },
+        status=status.HTTP_200_OK,
+    )
+
+
+@api_view(["GET"])
+def frequency(request):
+    """
+    GET /api/frequency[?surah=18&offset=0&limit=100]
+    جدول تكرار الكلمات مرتبًا تنازليًا (بدون surah: المصحف كاملًا).
+    """
+    surah_num = _surah_scope(request)
+    offset = max(0, _safe_int(request.GET.get("offset"), 0))
+    limit = _bound(_safe_int(request.GET.get("limit"), 100), 1, _FREQ_LIMIT_MAX)
+
+    table = frequency_table(surah_num)
+    if table is None:
+        return Response({"detail": "لا يوجد فهرس لهذه السورة."}, status=status.HTTP_404_NOT_FOUND)
+    rows, total_words = table
+    page = rows[offset : offset + limit]
+
+    return Response(
+        {
+            "surah": surah_num,
+            "total_words": total_words,
+            "unique_words": len(rows),
+            "offset": offset,
+            "limit": limit,
+            "count": len(page),
+            "results": [{"word": w, "count": c} for w, c in page],
+        },
+        status=status.HTTP_200_OK,
+    )
+
+
+# -------------------------------------------------
+# تشغيل الصوتيات (القراءات المختلفة)
+# -------------------------------------------------
+@cache_page(60 * 60)
+def _surah_audio_items(request, num: int, edition: str, window: int):
+    """روابط الصوت من API خارجي (alquran.cloud) + خطة التحميل المسبق — مخزنة ساعة."""
     try:
-        r = requests.get(f"{AUDIO_API_BASE}/surah/{num}/{edition}", timeout=15)
-        r.raise_for_status()
+        items = fetch_audio_items(num, edition)
     except RequestException as e:
         return Response({"detail": f"Audio API error: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
+    except ValueError as e:
+        return Response({"detail": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
 
-    payload = r.json()
-    if payload.get("code") != 200 or "data" not in payload:
-        return Response({"detail": "Unexpected audio API response."}, status=status.HTTP_502_BAD_GATEWAY)
+    return Response(
+        {
+            "surah": num,
+            "reciter_code": edition,
+            "count": len(items),
+            "items": items,
+            "prefetch": prefetch_plan(window),
+        },
+        status=status.HTTP_200_OK,
+    )
 
-    items = []
-    for a in payload["data"].get("ayahs", []):
-        n = a.get("numberInSurah")
-        url = a.get("audio") or (a.get("audioSecondary") or [None])[0]
-        if n and url:
-            items.append({"n": int(n), "url": url})
 
+def _surah_audio_manifest(request, num: int, edition: str, window: int):
+    """البيان المخزن (بدون فحص أو طلب خارجي) + خطة التحميل المسبق."""
+    manifest = AudioManifest.objects.filter(edition=edition, surah_number=num).first()
+    if manifest is None:
+        return Response(
+            {"detail": "لا يوجد بيان صوتي لهذا القارئ. شغّل build_audio_manifest."},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+
+    items = manifest.items
     return Response(
-        {"surah": num, "reciter_code": edition, "count": len(items), "items": items},
+        {
+            "surah": num,
+            "reciter_code": edition,
+            "count": len(items),
+            "items": items,
+            "complete": manifest.complete,
+            "total_duration": round(sum(m["duration"] for m in items), 3) if manifest.complete else None,
+            "prefetch": prefetch_plan(window),
+        },
         status=status.HTTP_200_OK,
     )
+
+
+@api_view(["GET"])
+def surah_audio_map(request, number: int = 18):
+    """
+    GET /api/surah/18/audio?reciter=minshawi[&manifest=1&prefetch=3]
+    جلب روابط الصوت للسورة من API خارجي (alquran.cloud) مع خطة التحميل المسبق.
+    - manifest=1: البيان المخزن (الحجم والمدة وإزاحة كل آية start/byte_offset)
+    - prefetch: عدد الآيات التالية المحمّلة مسبقًا أثناء التشغيل (<=8)
+    """
+    num = _bound(_safe_int(number, 18), _SURAH_MIN, _SURAH_MAX)
+    rec = (request.GET.get("reciter") or "minshawi").lower().strip()
+    edition = RECITERS.get(rec, rec)
+    window = _bound(_safe_int(request.GET.get("prefetch"), PREFETCH_WINDOW), 1, _PREFETCH_MAX)
+
+    if _safe_int(request.GET.get("manifest"), 0) == 1:
+        return _surah_audio_manifest(request, num, edition, window)
+    return _surah_audio_items(request, num, edition, window)
@@ -0,0 +1,250 @@
+# quran/audio.py
+"""
+فحص ملفات صوت الآيات (MP3) لبناء بيان تشغيل متصل (gapless).
+
+- يُقرأ رأس الملف فقط (Range) لاستخراج الحجم والمدة دون تنزيله كاملًا.
+- يُبنى البيان مرة واحدة لكل (قارئ، سورة) بأمر build_audio_manifest ويُخزَّن
+  في AudioManifest، فلا يُفحص أي ملف داخل الطلب.
+- يقبل روابط file:// داخل QURAN_AUDIO_LOCAL_ROOT فقط (لملفات تجريبية محلية).
+"""
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+import requests
+from requests import RequestException
+
+from django.conf import settings
+
+from quran.models import AudioManifest
+
+logger = logging.getLogger(__name__)
+
+RECITERS = {
+    "minshawi": "ar.minshawi",
+    "afasy": "ar.alafasy",
+    "ajamy": "ar.ajamy",
+    "husary": "ar.husary",
+}
+AUDIO_API_BASE = "https://api.alquran.cloud/v1"
+
+PROBE_HEAD_BYTES = 16 * 1024
+# أقصى امتداد لرأس الإطار مع Xing/VBRI بعد بدايته (VBRI ينتهي عند البايت 54)
+_VBR_PROBE_SPAN = 64
+PROBE_WORKERS = 8
+PREFETCH_WINDOW = 3
+
+# جداول معدّل البت (kbps) حسب (الإصدار، الطبقة)
+_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_SAMPLE_RATES = {1: [44100, 48000, 32000], 2: [22050, 24000, 16000], 25: [11025, 12000, 8000]}
+
+
+# -------------------------------------------------
+# تحليل رأس MP3
+# -------------------------------------------------
+def _id3_size(head: bytes) -> int:
+    """طول وسم ID3v2 في بداية الملف (0 إن لم يوجد)."""
+    if len(head) < 10 or head[:3] != b"ID3":
+        return 0
+    size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+    footer = 10 if head[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _parse_frame_header(b: bytes) -> Optional[Dict[str, int]]:
+    """تحليل رأس إطار MPEG (4 بايت) أو None إن لم يكن صالحًا."""
+    if len(b) < 4 or b[0] != 0xFF or (b[1] & 0xE0) != 0xE0:
+        return None
+    ver_bits = (b[1] >> 3) & 3
+    layer_bits = (b[1] >> 1) & 3
+    br_idx = b[2] >> 4
+    sr_idx = (b[2] >> 2) & 3
+    if ver_bits == 1 or layer_bits == 0 or br_idx in (0, 15) or sr_idx == 3:
+        return None
+
+    version = {3: 1, 2: 2, 0: 25}[ver_bits]
+    layer = 4 - layer_bits
+    bitrate = _BITRATES[(1 if version == 1 else 2, layer)][br_idx] * 1000
+    sample_rate = _SAMPLE_RATES[version][sr_idx]
+    if layer == 1:
+        spf = 384
+    elif layer == 3 and version != 1:
+        spf = 576
+    else:
+        spf = 1152
+    return {
+        "version": version,
+        "layer": layer,
+        "bitrate": bitrate,
+        "sample_rate": sample_rate,
+        "samples": spf,
+        "mono": int((b[3] >> 6) == 3),
+    }
+
+
+def _vbr_frames(frame: bytes, hdr: Dict[str, int]) -> Optional[int]:
+    """عدد الإطارات من رأس Xing/Info أو VBRI إن وُجد."""
+    if hdr["layer"] == 3:
+        if hdr["version"] == 1:
+            side = 17 if hdr["mono"] else 32
+        else:
+            side = 9 if hdr["mono"] else 17
+        pos = 4 + side
+        tag = frame[pos : pos + 4]
+        if tag in (b"Xing", b"Info") and len(frame) >= pos + 12:
+            flags = int.from_bytes(frame[pos + 4 : pos + 8], "big")
+            if flags & 1:
+                return int.from_bytes(frame[pos + 8 : pos + 12], "big")
+    # VBRI: "VBRI" + version(2) + delay(2) + quality(2) + bytes(4) + frames(4)
+    if frame[36:40] == b"VBRI" and len(frame) >= 54:
+        return int.from_bytes(frame[50:54], "big")
+    return None
+
+
+def mp3_duration(head: bytes, total_size: int, offset: int = 0) -> Optional[float]:
+    """
+    مدة ملف MP3 بالثواني من بدايته (head) وحجمه الكلي.
+    - offset: موضع head داخل الملف (بعد وسم ID3 إن قُرئ منفصلًا).
+    - VBR: من عدد الإطارات في رأس Xing/VBRI؛ CBR: من الحجم ومعدل البت.
+    """
+    start = 0 if offset else _id3_size(head)
+    for i in range(start, len(head) - 3):
+        hdr = _parse_frame_header(head[i : i + 4])
+        if hdr is None:
+            continue
+        frames = _vbr_frames(head[i:], hdr)
+        if frames:
+            return round(frames * hdr["samples"] / hdr["sample_rate"], 3)
+        audio_bytes = total_size - (offset + i)
+        return round(audio_bytes * 8 / hdr["bitrate"], 3)
+    return None
+
+
+# -------------------------------------------------
+# قراءة رأس الملف (HTTP Range أو محلي)
+# -------------------------------------------------
+def _local_path(url: str) -> Optional[Path]:
+    """مسار محلي لرابط file:// إن سُمح به، وإلا None (رابط HTTP)."""
+    if not url.startswith("file://"):
+        return None
+    root = getattr(settings, "QURAN_AUDIO_LOCAL_ROOT", None)
+    path = Path(url[len("file://") :]).resolve()
+    if not root or not path.is_relative_to(Path(root).resolve()):
+        raise ValueError(f"Local audio path not allowed: {url}")
+    return path
+
+
+def _read_range(url: str, start: int, length: int) -> Tuple[bytes, int]:
+    """قراءة [start, start+length) مع الحجم الكلي للملف."""
+    path = _local_path(url)
+    if path is not None:
+        with path.open("rb") as f:
+            f.seek(start)
+            return f.read(length), path.stat().st_size
+
+    headers = {"Range": f"bytes={start}-{start + length - 1}"}
+    with requests.get(url, headers=headers, stream=True, timeout=15) as r:
+        r.raise_for_status()
+        if r.status_code == 206:
+            # Content-Range: bytes 0-16383/123456
+            total = int(r.headers.get("Content-Range", "").rsplit("/", 1)[-1])
+            return r.content[:length], total
+        # الخادم تجاهل Range: نقرأ البداية فقط، ولا نخمّن الحجم إن لم يُعلَن
+        total = int(r.headers.get("Content-Length") or 0)
+        if not total:
+            raise ValueError(f"Unknown audio size (no Content-Length): {url}")
+        data = b""
+        for chunk in r.iter_content(chunk_size=PROBE_HEAD_BYTES):
+            data += chunk
+            if len(data) >= start + length:
+                break
+        return data[start : start + length], total
+
+
+def probe_audio(url: str) -> Dict[str, Any]:
+    """الحجم (بايت) والمدة (ثانية) لملف صوت واحد؛ None عند الفشل."""
+    try:
+        head, total = _read_range(url, 0, PROBE_HEAD_BYTES)
+        skip = _id3_size(head)
+        if skip and skip + _VBR_PROBE_SPAN > len(head):
+            # وسم ID3 كبير (صورة غلاف مثلًا) أو ينتهي قرب آخر القراءة: نقرأ ما بعده
+            head, _ = _read_range(url, skip, PROBE_HEAD_BYTES)
+            duration = mp3_duration(head, total, offset=skip)
+        else:
+            duration = mp3_duration(head, total)
+    except (RequestException, OSError, ValueError) as e:
+        logger.warning("Audio probe failed for %s: %s", url, e)
+        return {"bytes": None, "duration": None}
+    return {"bytes": total, "duration": duration}
+
+
+# -------------------------------------------------
+# البيان وخطة التحميل المسبق
+# -------------------------------------------------
+def build_manifest(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    إضافة bytes/duration لكل آية، مع جدول الإزاحة داخل السورة
+    (start بالثواني وbyte_offset) كأنها ملف واحد متصل.
+    """
+    with ThreadPoolExecutor(max_workers=PROBE_WORKERS) as pool:
+        probes = list(pool.map(lambda it: probe_audio(it["url"]), items))
+
+    out: List[Dict[str, Any]] = []
+    start: Optional[float] = 0.0
+    byte_offset: Optional[int] = 0
+    for it, p in zip(items, probes):
+        out.append({**it, **p, "start": start, "byte_offset": byte_offset})
+        start = round(start + p["duration"], 3) if start is not None and p["duration"] is not None else None
+        byte_offset = byte_offset + p["bytes"] if byte_offset is not None and p["bytes"] is not None else None
+    return out
+
+
+def fetch_audio_items(surah_num: int, edition: str) -> List[Dict[str, Any]]:
+    """
+    روابط صوت الآيات من alquran.cloud: [{"n", "url"}, ...].
+    يرفع RequestException عند خطأ HTTP وValueError عند استجابة غير متوقعة.
+    """
+    r = requests.get(f"{AUDIO_API_BASE}/surah/{surah_num}/{edition}", timeout=15)
+    r.raise_for_status()
+    payload = r.json()
+    if payload.get("code") != 200 or "data" not in payload:
+        raise ValueError("Unexpected audio API response.")
+
+    items = []
+    for a in payload["data"].get("ayahs", []):
+        n = a.get("numberInSurah")
+        url = a.get("audio") or (a.get("audioSecondary") or [None])[0]
+        if n and url:
+            items.append({"n": int(n), "url": url})
+    return items
+
+
+def store_manifest(edition: str, surah_num: int, items: List[Dict[str, Any]]) -> AudioManifest:
+    """فحص الملفات وحفظ البيان لكل (قارئ، سورة) ليقرأه كل العمّال من القاعدة."""
+    manifest = build_manifest(items)
+    obj, _ = AudioManifest.objects.update_or_create(
+        edition=edition,
+        surah_number=surah_num,
+        defaults={
+            "items": manifest,
+            "complete": all(m["duration"] is not None for m in manifest),
+        },
+    )
+    return obj
+
+
+def prefetch_plan(window: int = PREFETCH_WINDOW) -> Dict[str, int]:
+    """
+    خطة التحميل المسبق: أثناء تشغيل الآية k تُحمَّل الآيات k+1..k+window،
+    فلا يتجاوز عدد الطلبات المتزامنة window.
+    """
+    return {"window": window, "max_concurrent": window}
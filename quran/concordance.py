@@ -0,0 +1,142 @@
+# quran/concordance.py
+"""
+بناء فهرس الكلمات (concordance) وجداول التكرار لكل سورة وقراءتها.
+
+- يُبنى الفهرس مرة واحدة عند التحميل (load_surah18 / fetch_surah_online).
+- المواضع صفوف WordPosting مفهرسة بالكلمة، فالبحث عن كلمة لا يقرأ غيرها.
+- تكرار المصحف كاملًا يُدمج مرة ويُخزَّن في الكاش مفتاحه نسخة المدوّنة.
+"""
+from __future__ import annotations
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+import hashlib
+import re
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from quran.models import Surah, Ayah, Concordance, WordPosting
+
+_CACHE_PREFIX = "quran:concordance"
+_CACHE_TIMEOUT = 60 * 60
+# علامات الوقف والضبط القرآنية (U+06D6..U+06ED)
+_QURANIC_MARKS = re.compile(r"[\u06D6-\u06ED]+")
+
+
+def tokenize(normalized: str) -> List[str]:
+    """تقسيم النص المُطبَّع إلى كلمات (مع إسقاط علامات الوقف المنفردة مثل ۚ)."""
+    if not normalized:
+        return []
+    return [w for w in normalized.split() if not _QURANIC_MARKS.fullmatch(w)]
+
+
+def build_concordance(surah: Surah) -> Concordance:
+    """إعادة بناء فهرس سورة واحدة (التكرار + صفوف المواضع) من آياتها المخزنة."""
+    freq: Counter = Counter()
+    postings: List[WordPosting] = []
+    for ayah in Ayah.objects.filter(surah=surah).order_by("number").only("id", "normalized"):
+        for pos, word in enumerate(tokenize(ayah.normalized)):
+            freq[word] += 1
+            postings.append(WordPosting(word=word, ayah=ayah, position=pos))
+
+    WordPosting.objects.filter(ayah__surah=surah).delete()
+    WordPosting.objects.bulk_create(postings, batch_size=500)
+    conc, _ = Concordance.objects.update_or_create(
+        surah=surah,
+        defaults={
+            "frequencies": dict(freq),
+            "total_words": sum(freq.values()),
+        },
+    )
+    return conc
+
+
+def corpus_version() -> str:
+    """نسخة المدوّنة: تتغير كلما أُعيد بناء فهرس أي سورة."""
+    agg = Concordance.objects.aggregate(n=Count("id"), ts=Max("updated_at"))
+    ts = agg["ts"].timestamp() if agg["ts"] else 0
+    return f"{agg['n']}-{ts:.6f}"
+
+
+def _sorted_table(freq: Dict[str, int]) -> List[Tuple[str, int]]:
+    """ترتيب الكلمات تنازليًا حسب التكرار ثم أبجديًا."""
+    return sorted(freq.items(), key=lambda kv: (-kv[1], kv[0]))
+
+
+def frequency_table(surah_num: int | None) -> Tuple[List[Tuple[str, int]], int] | None:
+    """
+    جدول التكرار مرتبًا مع مجموع الكلمات.
+    - surah_num=None: المصحف كاملًا (قراءة واحدة من الكاش).
+    - يُرجع None إن لم يوجد فهرس للسورة.
+    """
+    version = corpus_version()
+    key = f"{_CACHE_PREFIX}:freq:{surah_num or 'all'}:{version}"
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
+
+    if surah_num is None:
+        merged: Counter = Counter()
+        total = 0
+        for freq, words in Concordance.objects.values_list("frequencies", "total_words"):
+            merged.update(freq)
+            total += words
+        result = (_sorted_table(merged), total)
+    else:
+        row = (
+            Concordance.objects.filter(surah__number=surah_num)
+            .values_list("frequencies", "total_words")
+            .first()
+        )
+        if row is None:
+            return None
+        result = (_sorted_table(row[0]), row[1])
+
+    cache.set(key, result, _CACHE_TIMEOUT)
+    return result
+
+
+def word_locations(word: str, surah_num: int | None) -> List[Tuple[int, int, int, int]]:
+    """
+    مواضع الكلمة المُطبَّعة: [(السورة, الآية, الموضع, معرّف الآية), ...] مرتبة
+    (استعلام مفهرس بالكلمة).
+    """
+    digest = hashlib.md5(word.encode("utf-8")).hexdigest()
+    key = f"{_CACHE_PREFIX}:loc:{surah_num or 'all'}:{digest}:{corpus_version()}"
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
+
+    qs = WordPosting.objects.filter(word=word)
+    if surah_num is not None:
+        qs = qs.filter(ayah__surah__number=surah_num)
+    locs = list(qs.values_list("ayah__surah__number", "ayah__number", "position", "ayah_id"))
+
+    cache.set(key, locs, _CACHE_TIMEOUT)
+    return locs
+
+
+def concordance_lines(locs: Iterable[Tuple[int, int, int, int]], context: int) -> List[dict]:
+    """بناء أسطر السياق (يسار/يمين) لصفحة من المواضع بجلب آياتها فقط بالمفتاح الأساسي."""
+    locs = list(locs)
+    if not locs:
+        return []
+    texts = {
+        pk: tokenize(norm)
+        for pk, norm in Ayah.objects.filter(pk__in={a for *_, a in locs}).values_list("id", "normalized")
+    }
+
+    lines: List[dict] = []
+    for s, n, pos, ayah_id in locs:
+        words = texts.get(ayah_id, [])
+        lines.append(
+            {
+                "surah": s,
+                "ayah": n,
+                "position": pos,
+                "word": words[pos] if pos < len(words) else "",
+                "left": " ".join(words[max(0, pos - context) : pos]),
+                "right": " ".join(words[pos + 1 : pos + 1 + context]),
+            }
+        )
+    return lines
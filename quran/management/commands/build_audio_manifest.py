@@ -0,0 +1,28 @@
+# quran/management/commands/build_audio_manifest.py
+from django.core.management.base import BaseCommand
+from requests import RequestException
+
+from quran.audio import RECITERS, fetch_audio_items, store_manifest
+
+class Command(BaseCommand):
+    help = "Probe ayah audio files and store the per-reciter manifest (default: surah 18, all reciters)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--number", type=int, default=18)
+        parser.add_argument("--reciter", type=str, default=None)
+
+    def handle(self, *args, **opts):
+        number = int(opts["number"])
+        rec = (opts["reciter"] or "").lower().strip()
+        editions = [RECITERS.get(rec, rec)] if rec else list(RECITERS.values())
+
+        for edition in editions:
+            try:
+                items = fetch_audio_items(number, edition)
+            except (RequestException, ValueError) as e:
+                self.stderr.write(self.style.ERROR(f"{edition}: audio API error: {e}"))
+                continue
+            manifest = store_manifest(edition, number, items)
+            style = self.style.SUCCESS if manifest.complete else self.style.WARNING
+            probed = sum(1 for m in manifest.items if m["duration"] is not None)
+            self.stdout.write(style(f"{edition}: surah {number}, {probed}/{len(items)} ayahs probed"))
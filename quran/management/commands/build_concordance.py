@@ -0,0 +1,24 @@
+# quran/management/commands/build_concordance.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from quran.models import Surah
+from quran.concordance import build_concordance
+
+class Command(BaseCommand):
+    help = "Rebuild the word concordance for stored surahs (default: all)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--number", type=int, default=None)
+
+    def handle(self, *args, **opts):
+        qs = Surah.objects.order_by("number")
+        if opts["number"] is not None:
+            qs = qs.filter(number=int(opts["number"]))
+        done = 0
+        with transaction.atomic():
+            for surah in qs:
+                conc = build_concordance(surah)
+                done += 1
+                self.stdout.write(f"Surah {surah.number}: {conc.total_words} words")
+        self.stdout.write(self.style.SUCCESS(f"Built concordance for {done} surah(s)"))
@@ -6,6 +6,7 @@ from requests import RequestException
 
 from quran.models import Surah, Ayah
 from quran.utils import normalize_arabic
+from quran.concordance import build_concordance
 
 API_BASE = "https://api.alquran.cloud/v1"
 TEXT_EDITION = "quran-uthmani"
@@ -46,4 +47,5 @@ class Command(BaseCommand):
                 text = a.get("text") or ""
                 bulk.append(Ayah(surah=surah, number=n, text=text, normalized=normalize_arabic(text)))
             Ayah.objects.bulk_create(bulk, batch_size=200)
+            build_concordance(surah)
         self.stdout.write(self.style.SUCCESS(f"Loaded Surah {number}: {len(ayahs)} ayahs"))
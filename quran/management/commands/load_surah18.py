@@ -5,6 +5,7 @@ import json
 
 from quran.models import Surah, Ayah
 from quran.utils import normalize_arabic
+from quran.concordance import build_concordance
 
 class Command(BaseCommand):
     help = "Load Surah Al-Kahf (18) from surah18.json into DB."
@@ -42,5 +43,7 @@ class Command(BaseCommand):
                     normalized=normalize_arabic(t),
                 ))
             Ayah.objects.bulk_create(objs, batch_size=200)
+            # بناء فهرس الكلمات مرة واحدة عند التحميل
+            build_concordance(surah)
 
         self.stdout.write(self.style.SUCCESS(f"✅ تم تحميل سورة الكهف ({len(ayahs)} آية)."))
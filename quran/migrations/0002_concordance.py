@@ -0,0 +1,69 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:43
+
+import django.db.models.deletion
+import re
+from collections import Counter
+
+from django.db import migrations, models
+
+
+QURANIC_MARKS = re.compile(r"[\u06D6-\u06ED]+")
+
+
+def build_existing_concordances(apps, schema_editor):
+    """بناء فهرس الكلمات للسور المحمّلة مسبقًا (بدل تشغيل build_concordance يدويًا)."""
+    Surah = apps.get_model("quran", "Surah")
+    Ayah = apps.get_model("quran", "Ayah")
+    Concordance = apps.get_model("quran", "Concordance")
+    WordPosting = apps.get_model("quran", "WordPosting")
+
+    for surah in Surah.objects.all():
+        freq = Counter()
+        postings = []
+        for ayah in Ayah.objects.filter(surah=surah).order_by("number"):
+            words = [w for w in (ayah.normalized or "").split() if not QURANIC_MARKS.fullmatch(w)]
+            for pos, word in enumerate(words):
+                freq[word] += 1
+                postings.append(WordPosting(word=word, ayah=ayah, position=pos))
+        WordPosting.objects.bulk_create(postings, batch_size=500)
+        Concordance.objects.update_or_create(
+            surah=surah,
+            defaults={"frequencies": dict(freq), "total_words": sum(freq.values())},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Concordance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('frequencies', models.JSONField(default=dict)),
+                ('total_words', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('surah', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='concordance', to='quran.surah')),
+            ],
+            options={
+                'verbose_name': 'فهرس كلمات',
+                'verbose_name_plural': 'فهارس الكلمات',
+            },
+        ),
+        migrations.CreateModel(
+            name='WordPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('word', models.CharField(db_index=True, max_length=64)),
+                ('position', models.PositiveIntegerField()),
+                ('ayah', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='word_postings', to='quran.ayah')),
+            ],
+            options={
+                'ordering': ['ayah__surah__number', 'ayah__number', 'position'],
+            },
+        ),
+        migrations.RunPython(build_existing_concordances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0002_concordance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudioManifest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('edition', models.CharField(max_length=64)),
+                ('surah_number', models.PositiveIntegerField()),
+                ('items', models.JSONField(default=list)),
+                ('complete', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'بيان صوت',
+                'verbose_name_plural': 'بيانات الصوت',
+                'unique_together': {('edition', 'surah_number')},
+            },
+        ),
+    ]
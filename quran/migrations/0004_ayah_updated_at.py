@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0003_audio_manifest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ayah',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -16,6 +16,7 @@ class Ayah(models.Model):
     number = models.PositiveIntegerField()
     text = models.TextField()
     normalized = models.TextField(db_index=True, blank=True, default="")
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ("surah", "number")
@@ -23,3 +24,50 @@ class Ayah(models.Model):
 
     def __str__(self):
         return f"{self.surah.name}:{self.number}"
+
+
+class Concordance(models.Model):
+    """جدول تكرار كلمات السورة، يُبنى عند التحميل من Ayah.normalized."""
+    surah = models.OneToOneField(Surah, related_name="concordance", on_delete=models.CASCADE)
+    # {"كلمة": عدد}
+    frequencies = models.JSONField(default=dict)
+    total_words = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "فهرس كلمات"
+        verbose_name_plural = "فهارس الكلمات"
+
+    def __str__(self):
+        return f"{self.surah.name} ({self.total_words})"
+
+
+class WordPosting(models.Model):
+    """موضع كلمة مُطبَّعة داخل آية (صف لكل ظهور، مفهرس بالكلمة)."""
+    word = models.CharField(max_length=64, db_index=True)
+    ayah = models.ForeignKey(Ayah, related_name="word_postings", on_delete=models.CASCADE)
+    position = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ["ayah__surah__number", "ayah__number", "position"]
+
+    def __str__(self):
+        return f"{self.word} @ {self.ayah}:{self.position}"
+
+
+class AudioManifest(models.Model):
+    """بيان صوت السورة لقارئ واحد (حجم/مدة/إزاحة كل آية)، يُبنى بأمر build_audio_manifest."""
+    edition = models.CharField(max_length=64)
+    surah_number = models.PositiveIntegerField()
+    # [{"n", "url", "bytes", "duration", "start", "byte_offset"}, ...]
+    items = models.JSONField(default=list)
+    complete = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("edition", "surah_number")
+        verbose_name = "بيان صوت"
+        verbose_name_plural = "بيانات الصوت"
+
+    def __str__(self):
+        return f"{self.edition}:{self.surah_number}"
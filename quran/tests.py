@@ -1,3 +1,313 @@
-from django.test import TestCase
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from quran.audio import PROBE_HEAD_BYTES, _read_range, mp3_duration, probe_audio, store_manifest
+from quran.concordance import build_concordance
+from quran.models import Surah, Ayah, Concordance, WordPosting, AudioManifest
+from quran.utils import normalize_arabic
+
+
+def _make_surah(number, name, texts):
+    surah = Surah.objects.create(number=number, name=name)
+    Ayah.objects.bulk_create(
+        Ayah(surah=surah, number=i, text=t, normalized=normalize_arabic(t))
+        for i, t in enumerate(texts, start=1)
+    )
+    return surah
+
+
+class ConcordanceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.kahf = _make_surah(18, "الكهف", [
+            "الْحَمْدُ لِلَّهِ الَّذِي أَنْزَلَ عَلَىٰ عَبْدِهِ الْكِتَابَ",
+            "قَالُوا اتَّخَذَ اللَّهُ وَلَدًا",
+            "عَلَى اللَّهِ كَذِبًا وَمَنْ أَظْلَمُ",
+        ])
+        self.maryam = _make_surah(19, "مريم", ["ذِكْرُ رَحْمَتِ رَبِّكَ عَبْدَهُ زَكَرِيَّا ۚ", "اللَّهُ"])
+        build_concordance(self.kahf)
+        build_concordance(self.maryam)
+
+    def test_build_concordance_counts_and_postings(self):
+        conc = Concordance.objects.get(surah=self.kahf)
+        self.assertEqual(conc.total_words, 16)
+        self.assertEqual(conc.frequencies["الله"], 2)
+        self.assertEqual(conc.frequencies["علي"], 2)
+        self.assertEqual(
+            list(WordPosting.objects.filter(word="الله", ayah__surah=self.kahf)
+                 .values_list("ayah__number", "position")),
+            [(2, 2), (3, 1)],
+        )
+
+    def test_rebuild_replaces_postings(self):
+        build_concordance(self.kahf)
+        self.assertEqual(WordPosting.objects.filter(ayah__surah=self.kahf).count(), 16)
+
+    def test_frequency_per_surah(self):
+        res = self.client.get("/api/frequency", {"surah": 18, "limit": 2})
+        self.assertEqual(res.status_code, 200)
+        data = res.json()
+        self.assertEqual(data["total_words"], 16)
+        self.assertEqual(data["results"], [{"word": "الله", "count": 2}, {"word": "علي", "count": 2}])
+
+    def test_frequency_whole_corpus(self):
+        data = self.client.get("/api/frequency", {"limit": 1}).json()
+        self.assertIsNone(data["surah"])
+        self.assertEqual(data["total_words"], 22)
+        self.assertEqual(data["results"], [{"word": "الله", "count": 3}])
+
+    def test_frequency_without_index_is_404(self):
+        Surah.objects.create(number=20, name="طه")
+        self.assertEqual(self.client.get("/api/frequency", {"surah": 20}).status_code, 404)
+
+    def test_concordance_context(self):
+        data = self.client.get("/api/concordance", {"word": "اللَّهُ", "surah": 18, "context": 1}).json()
+        self.assertEqual(data["hits"], 2)
+        self.assertEqual(data["results"][0], {
+            "surah": 18, "ayah": 2, "position": 2, "word": "الله", "left": "اتخذ", "right": "ولدا",
+        })
+        self.assertEqual(data["results"][1]["left"], "علي")
+
+    def test_concordance_whole_corpus_and_paging(self):
+        data = self.client.get("/api/concordance", {"word": "الله", "offset": 2, "limit": 5}).json()
+        self.assertEqual(data["hits"], 3)
+        self.assertEqual([(r["surah"], r["ayah"]) for r in data["results"]], [(19, 2)])
+
+    def test_concordance_rejects_multi_word(self):
+        self.assertEqual(self.client.get("/api/concordance", {"word": "الله ولدا"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/concordance").status_code, 400)
+
+    def test_cache_invalidated_when_corpus_version_changes(self):
+        self.assertEqual(self.client.get("/api/concordance", {"word": "زكريا"}).json()["hits"], 1)
+        Ayah.objects.filter(surah=self.maryam, number=2).update(normalized="زكريا الله")
+        build_concordance(self.maryam)
+        self.assertEqual(self.client.get("/api/concordance", {"word": "زكريا"}).json()["hits"], 2)
+        data = self.client.get("/api/frequency", {"surah": 19}).json()
+        self.assertEqual(data["total_words"], 7)
+
+
+class SearchPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.surah = _make_surah(18, "الكهف", [
+            "اللَّهُ", "نَصٌّ", "اللَّهُ", "اللَّهُ", "نَصٌّ", "اللَّهُ", "اللَّهُ",
+        ])
+        build_concordance(self.surah)
+
+    def _search(self, **params):
+        res = self.client.get("/api/search", {"surah": 18, "q": "الله", "limit": 2, **params})
+        return res.status_code, res.json()
+
+    def test_after_round_trip(self):
+        seen, after = [], ""
+        while True:
+            code, data = self._search(after=after)
+            self.assertEqual(code, 200)
+            self.assertEqual(data["hits"], 5)
+            seen += [r["number"] for r in data["results"]]
+            after = data["next_after"]
+            if after is None:
+                break
+        self.assertEqual(seen, [1, 3, 4, 6, 7])
+
+    def test_empty_after_is_first_page(self):
+        self.assertEqual(self._search(after="")[1]["results"], self._search()[1]["results"])
+
+    def test_after_uses_ayah_number_not_list_position(self):
+        # آية غير مطابقة كمؤشر: تبدأ الصفحة بأول مطابقة بعدها
+        cursor = Ayah.objects.get(surah=self.surah, number=5).pk
+        code, data = self._search(after=cursor)
+        self.assertEqual(code, 200)
+        self.assertEqual([r["number"] for r in data["results"]], [6, 7])
+        self.assertIsNone(data["next_after"])
+
+    def test_invalid_after(self):
+        self.assertEqual(self._search(after="zz")[0], 400)
+        other = _make_surah(19, "مريم", ["اللَّهُ"])
+        self.assertEqual(self._search(after=other.ayahs.get().pk)[0], 400)
+
+    def test_offset_mode_still_works(self):
+        data = self._search(offset=2)[1]
+        self.assertEqual([r["number"] for r in data["results"]], [4, 6])
+
+    def test_cache_follows_ayah_edits(self):
+        self.assertEqual(self._search()[1]["hits"], 5)
+        ayah = Ayah.objects.get(surah=self.surah, number=2)
+        ayah.normalized = "الله"
+        ayah.save()
+        self.assertEqual(self._search()[1]["hits"], 6)
+
+    def test_cache_follows_ayah_deletes(self):
+        self.assertEqual(self._search()[1]["hits"], 5)
+        Ayah.objects.filter(surah=self.surah, number=7).delete()
+        code, data = self._search(offset=4)
+        self.assertEqual((data["hits"], data["results"]), (4, []))
+
+
+# إطار MPEG1 Layer III، 128kbps، 44100Hz، ستيريو مشترك: 417 بايت و1152 عينة
+_FRAME_HDR = bytes([0xFF, 0xFB, 0x90, 0x44])
+_FRAME_SIZE = 417
+
+
+def _cbr_frames(count):
+    return (_FRAME_HDR + bytes(_FRAME_SIZE - 4)) * count
+
+
+def _id3_tag(size):
+    syncsafe = bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F])
+    return b"ID3\x03\x00\x00" + syncsafe + bytes(size)
+
+
+def _vbr_frame(tag, frames):
+    frame = bytearray(_FRAME_HDR + bytes(_FRAME_SIZE - 4))
+    frame[36:40] = tag
+    if tag == b"Xing":
+        frame[40:44] = (1).to_bytes(4, "big")  # flags: عدد الإطارات موجود
+        frame[44:48] = frames.to_bytes(4, "big")
+    else:
+        frame[50:54] = frames.to_bytes(4, "big")
+    return bytes(frame)
+
+
+def _cbr_seconds(count):
+    return count * _FRAME_SIZE * 8 / 128000
+
+
+class AudioProbeTests(TestCase):
+    def setUp(self):
+        self._tmp = TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.settings_override = override_settings(QURAN_AUDIO_LOCAL_ROOT=self._tmp.name)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self._tmp.cleanup()
+
+    def _fixture(self, name, data):
+        path = self.root / name
+        path.write_bytes(data)
+        return f"file://{path}"
+
+    def test_cbr(self):
+        url = self._fixture("cbr.mp3", _cbr_frames(100))
+        self.assertEqual(probe_audio(url), {"bytes": 100 * _FRAME_SIZE, "duration": round(_cbr_seconds(100), 3)})
+
+    def test_xing_frame_count(self):
+        url = self._fixture("xing.mp3", _id3_tag(1000) + _vbr_frame(b"Xing", 500) + _cbr_frames(10))
+        self.assertAlmostEqual(probe_audio(url)["duration"], 500 * 1152 / 44100, places=3)
+
+    def test_vbri_frame_count(self):
+        head = _vbr_frame(b"VBRI", 250) + _cbr_frames(10)
+        self.assertAlmostEqual(mp3_duration(head, len(head)), 250 * 1152 / 44100, places=3)
+
+    def test_id3_larger_than_first_read(self):
+        tag = _id3_tag(PROBE_HEAD_BYTES * 2)
+        url = self._fixture("cover.mp3", tag + _cbr_frames(200))
+        probe = probe_audio(url)
+        self.assertEqual(probe["bytes"], len(tag) + 200 * _FRAME_SIZE)
+        self.assertAlmostEqual(probe["duration"], _cbr_seconds(200), places=2)
+
+    def test_id3_ending_just_before_first_read_end(self):
+        # رأس الإطار داخل أول قراءة لكن رأس Xing بعدها: يجب إعادة القراءة لا تقدير CBR
+        tag = _id3_tag(PROBE_HEAD_BYTES - 20 - 10)
+        url = self._fixture("near.mp3", tag + _vbr_frame(b"Xing", 500) + _cbr_frames(10))
+        self.assertAlmostEqual(probe_audio(url)["duration"], 500 * 1152 / 44100, places=3)
+
+    def test_frame_sync_in_last_four_bytes(self):
+        head = bytes(10) + _FRAME_HDR
+        self.assertIsNotNone(mp3_duration(head, 10 + _FRAME_SIZE))
+
+    def test_not_mp3(self):
+        url = self._fixture("junk.mp3", bytes(2048))
+        self.assertEqual(probe_audio(url), {"bytes": 2048, "duration": None})
+
+    def test_path_outside_root_rejected(self):
+        with TemporaryDirectory() as other:
+            outside = Path(other) / "a.mp3"
+            outside.write_bytes(_cbr_frames(5))
+            self.assertEqual(probe_audio(f"file://{outside}"), {"bytes": None, "duration": None})
+            with override_settings(QURAN_AUDIO_LOCAL_ROOT=None):
+                self.assertIsNone(probe_audio(self._fixture("b.mp3", _cbr_frames(5)))["duration"])
+
+    def test_read_range_partial_content(self):
+        resp = mock.MagicMock(status_code=206, headers={"Content-Range": "bytes 0-99/5000"}, content=bytes(100))
+        with mock.patch("quran.audio.requests.get") as get:
+            get.return_value.__enter__.return_value = resp
+            self.assertEqual(_read_range("https://cdn.example/1.mp3", 0, 100), (bytes(100), 5000))
+            self.assertEqual(get.call_args.kwargs["headers"], {"Range": "bytes=0-99"})
+
+    def test_read_range_ignored_by_server(self):
+        resp = mock.MagicMock(status_code=200, headers={"Content-Length": "5000"})
+        resp.iter_content.return_value = iter([b"a" * 60, b"b" * 60, b"c" * 60])
+        with mock.patch("quran.audio.requests.get") as get:
+            get.return_value.__enter__.return_value = resp
+            data, total = _read_range("https://cdn.example/1.mp3", 0, 100)
+        self.assertEqual((data, total), (b"a" * 60 + b"b" * 40, 5000))
+
+    def test_read_range_unknown_size_fails(self):
+        resp = mock.MagicMock(status_code=200, headers={})
+        resp.iter_content.return_value = iter([b"a" * 60, b"b" * 60])
+        with mock.patch("quran.audio.requests.get") as get:
+            get.return_value.__enter__.return_value = resp
+            with self.assertRaises(ValueError):
+                _read_range("https://cdn.example/1.mp3", 0, 100)
+            get.return_value.__enter__.return_value.iter_content.return_value = iter([_cbr_frames(1)])
+            self.assertEqual(probe_audio("https://cdn.example/1.mp3"), {"bytes": None, "duration": None})
+
+    def test_store_manifest_offsets(self):
+        items = [
+            {"n": 1, "url": self._fixture("1.mp3", _cbr_frames(100))},
+            {"n": 2, "url": self._fixture("2.mp3", _cbr_frames(50))},
+            {"n": 3, "url": self._fixture("3.mp3", _cbr_frames(10))},
+        ]
+        manifest = store_manifest("ar.test", 18, items)
+        self.assertTrue(manifest.complete)
+        self.assertEqual([m["byte_offset"] for m in manifest.items], [0, 100 * _FRAME_SIZE, 150 * _FRAME_SIZE])
+        self.assertEqual([m["start"] for m in manifest.items], [0.0, 2.606, 3.909])
+
+    def test_store_manifest_incomplete(self):
+        items = [{"n": 1, "url": "file:///nowhere/1.mp3"}, {"n": 2, "url": self._fixture("2.mp3", _cbr_frames(10))}]
+        manifest = store_manifest("ar.test", 18, items)
+        self.assertFalse(manifest.complete)
+        self.assertEqual([m["start"] for m in manifest.items], [0.0, None])
+
+
+class AudioEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_manifest_is_read_from_db_only(self):
+        AudioManifest.objects.create(
+            edition="ar.minshawi",
+            surah_number=18,
+            complete=True,
+            items=[
+                {"n": i, "url": f"https://cdn.example/{i}.mp3", "bytes": 1000, "duration": 2.5,
+                 "start": 2.5 * (i - 1), "byte_offset": 1000 * (i - 1)}
+                for i in range(1, 6)
+            ],
+        )
+        with mock.patch("quran.audio.requests.get") as get:
+            res = self.client.get("/api/surah/18/audio", {"manifest": 1, "prefetch": 2})
+            get.assert_not_called()
+        data = res.json()
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data["total_duration"], 12.5)
+        self.assertEqual(data["prefetch"], {"window": 2, "max_concurrent": 2})
+
+    def test_manifest_missing_is_404(self):
+        self.assertEqual(self.client.get("/api/surah/18/audio", {"manifest": 1}).status_code, 404)
+
+    def test_audio_map_from_upstream(self):
+        payload = {"code": 200, "data": {"ayahs": [{"numberInSurah": 1, "audio": "https://cdn.example/1.mp3"}]}}
+        with mock.patch("quran.audio.requests.get") as get:
+            get.return_value.json.return_value = payload
+            data = self.client.get("/api/surah/18/audio", {"reciter": "afasy"}).json()
+        self.assertEqual(data["reciter_code"], "ar.alafasy")
+        self.assertEqual(data["items"], [{"n": 1, "url": "https://cdn.example/1.mp3"}])
+        self.assertEqual(data["prefetch"], {"window": 3, "max_concurrent": 3})